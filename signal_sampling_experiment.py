@@ -14,48 +14,204 @@
 - 'q' 键: 退出
 """
 
+import math
+import os
+from collections import OrderedDict
+
 import numpy as np
 import matplotlib.pyplot as plt
 from matplotlib.gridspec import GridSpec
-from scipy.fft import fft, fftfreq
+from matplotlib.collections import LineCollection
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from scipy.fft import rfft, rfftfreq
 import matplotlib as mpl
 # 预先导入用于插值的模块，避免每次调用函数时重新导入
-from scipy.interpolate import splrep, splev, interp1d
+from scipy.interpolate import CubicSpline
+# Pillow是matplotlib的依赖，直接用它编码PNG
+from PIL import Image
+
+# numba为可选依赖，安装后用JIT内核生成信号，否则退回到NumPy实现
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+# pyFFTW同为可选依赖，安装后按点数缓存FFT计划，否则使用scipy.fft
+try:
+    import pyfftw
+except ImportError:
+    pyfftw = None
 
 mpl.rcParams['axes.unicode_minus'] = False  # 解决保存图像时负号'-'显示为方块的问题
+mpl.rcParams['agg.path.chunksize'] = 10000  # 分块渲染长曲线，加快Agg绘制大量采样点
 
 # 原始信号参数
 f1 = 1000  # Hz
 f2 = 1100  # Hz
 phase = np.pi / 4
 
+# 交互模式下最近几组 (fs, N) 的采样结果缓存: (fs, N) -> (sampled_signal, spectrum)
+_cache = OrderedDict()
+_CACHE_SIZE = 4
+
+# 按采样点数缓存的pyFFTW计划: N -> FFTW对象，首次出现的点数记为None
+# 创建计划比一次scipy.fft.rfft慢得多，只为重复出现的点数创建，且最多保留若干个
+_fftw_plans = OrderedDict()
+_FFTW_PLAN_LIMIT = 8
+
+# 点数少于该值时FFT单线程执行，避免线程调度开销超过计算本身
+_FFT_PARALLEL_MIN = 512
+
+# 余弦递推每隔多少个采样点用精确cos重新起算一次，抑制误差累积
+_RESEED_INTERVAL = 10000
+
+if njit is not None:
+    def _gen_signal(N, t0, dt, f1, f2, phase, out):
+        """在均匀时间点 t0 + i*dt 上计算两个余弦之和
+        
+        利用 cos(θ+Δ) = 2cos(Δ)·cos(θ) - cos(θ-Δ) 递推，每个点只需乘加运算；
+        每段开头用精确cos重新起算，抑制递推误差的累积。
+        """
+        w1 = 2 * math.pi * f1
+        w2 = 2 * math.pi * f2
+        k1 = 2 * math.cos(w1 * dt)
+        k2 = 2 * math.cos(w2 * dt)
+        n_blocks = (N + _RESEED_INTERVAL - 1) // _RESEED_INTERVAL
+        for b in range(n_blocks):
+            start = b * _RESEED_INTERVAL
+            stop = min(start + _RESEED_INTERVAL, N)
+            ts = t0 + start * dt
+            a_prev = math.cos(w1 * (ts - dt) + phase)
+            a_cur = math.cos(w1 * ts + phase)
+            b_prev = math.cos(w2 * (ts - dt))
+            b_cur = math.cos(w2 * ts)
+            for i in range(start, stop):
+                out[i] = a_cur + b_cur
+                a_prev, a_cur = a_cur, k1 * a_cur - a_prev
+                b_prev, b_cur = b_cur, k2 * b_cur - b_prev
+    
+    try:
+        _gen_signal = njit(cache=True, fastmath=True)(_gen_signal)
+    except RuntimeError:
+        # 源文件不在磁盘上时(如PyInstaller单文件打包)无法缓存编译结果，改为每次运行时编译
+        _gen_signal = njit(fastmath=True)(_gen_signal)
+
 # 生成原始信号
 def generate_signal(t):
-    """生成原始信号 cos(2π*f1*t+π/4) + cos(2π*f2*t)"""
-    return np.cos(2 * np.pi * f1 * t + phase) + np.cos(2 * np.pi * f2 * t)
+    """生成原始信号 cos(2π*f1*t+π/4) + cos(2π*f2*t)，以float32返回"""
+    t = np.asarray(t)
+    x = np.atleast_1d(t)
+    # 两个分量各自原地计算相位和余弦，再原地相加，避免额外的临时数组
+    a = x * (2 * np.pi * f1)
+    a += phase
+    np.cos(a, out=a)
+    b = x * (2 * np.pi * f2)
+    np.cos(b, out=b)
+    a += b
+    return a.astype(np.float32, copy=False).reshape(t.shape)[()]
+
+def generate_uniform_signal(t0, dt, N):
+    """在均匀时间点 t0 + n*dt (n = 0..N-1) 上生成原始信号，有numba时交给JIT内核计算"""
+    if njit is None:
+        return generate_signal(t0 + np.arange(N) * dt)
+    out = np.empty(N, dtype=np.float32)
+    _gen_signal(N, float(t0), float(dt), f1, f2, phase, out)
+    return out
+
+def compute_rfft(x):
+    """计算实信号的单边FFT，有pyFFTW时对重复出现的点数复用计划，只执行不重新规划"""
+    # 统一按float32计算，两条路径都返回complex64
+    x = np.asarray(x, dtype=np.float32)
+    N = len(x)
+    threads = os.cpu_count() if N >= _FFT_PARALLEL_MIN else 1
+    if pyfftw is None:
+        return rfft(x, workers=threads)
+    
+    # 第一次遇到的点数直接用scipy，第二次遇到时才创建计划
+    if N not in _fftw_plans:
+        _fftw_plans[N] = None
+        if len(_fftw_plans) > _FFTW_PLAN_LIMIT:
+            _fftw_plans.popitem(last=False)  # 淘汰最久未使用的计划
+        return rfft(x, workers=threads)
+    
+    _fftw_plans.move_to_end(N)
+    plan = _fftw_plans[N]
+    if plan is None:
+        plan = pyfftw.builders.rfft(pyfftw.empty_aligned(N, dtype='float32'),
+                                    threads=threads)
+        _fftw_plans[N] = plan
+    plan.input_array[:] = x
+    # 计划的输出数组会被下一次调用覆盖，结果需要复制出来
+    return plan().copy()
+
+def sample_and_transform(fs, N):
+    """以采样频率fs采样N个点并计算频谱，复用缓存中相同参数或相同fs下较短的采样结果"""
+    key = (fs, N)
+    if key in _cache:
+        _cache.move_to_end(key)
+        return _cache[key]
+    
+    # 采样频率相同而点数更少时，只需补算新增的尾部采样点
+    # 采样时间统一按双精度的 n/fs 计算，补算的尾部与整段重新生成的结果一致
+    prefix = max((n for (f, n) in _cache if f == fs and n < N), default=0)
+    if prefix:
+        signal_old, _ = _cache[(fs, prefix)]
+        tail = generate_uniform_signal(prefix / fs, 1.0 / fs, N - prefix)
+        sampled_signal = np.concatenate((signal_old, tail))
+    else:
+        sampled_signal = generate_uniform_signal(0.0, 1.0 / fs, N)
+    
+    spectrum = compute_rfft(sampled_signal)
+    
+    _cache[key] = (sampled_signal, spectrum)
+    if len(_cache) > _CACHE_SIZE:
+        _cache.popitem(last=False)  # 淘汰最久未使用的结果
+    return _cache[key]
+
+def save_png(fig, filename, dpi=150):
+    """将图表渲染为RGBA像素后用Pillow以低压缩等级写出PNG，比savefig的默认编码更快"""
+    # 临时换用Agg画布按目标dpi渲染，像素尺寸取自渲染结果本身，结束后恢复原画布和dpi
+    orig_canvas, orig_dpi = fig.canvas, fig.dpi
+    canvas = FigureCanvasAgg(fig)
+    try:
+        fig.dpi = dpi
+        buf, size = canvas.print_to_buffer()
+    finally:
+        fig.dpi = orig_dpi
+        fig.set_canvas(orig_canvas)
+    image = Image.frombuffer('RGBA', size, buf, 'raw', 'RGBA', 0, 1)
+    image.save(filename, compress_level=1, dpi=(dpi, dpi))
+
+def stem_segments(freqs, magnitude):
+    """生成频谱柱状图的竖线段，每个频点对应一条从0到幅值的线段"""
+    return np.stack((np.column_stack((freqs, np.zeros_like(freqs))),
+                     np.column_stack((freqs, magnitude))), axis=1)
 
 # 进行频谱分析
-def analyze_spectrum(signal, fs, N, title=""):
-    """分析信号的频谱"""
+def analyze_spectrum(signal, fs, N, title="", fig=None):
+    """分析信号的频谱，传入fig时清空后在其上重绘，否则新建图表"""
     # 计算时间点
-    t = np.arange(N) / fs
+    t = np.arange(N, dtype=np.float32) / np.float32(fs)
     
-    # 采样信号
-    sampled_signal = signal(t)
+    # 采样信号 - 原始信号在均匀时间点上走专用的快速路径
+    if signal is generate_signal:
+        sampled_signal = generate_uniform_signal(0.0, 1.0 / fs, N)
+    else:
+        sampled_signal = signal(t)
     
-    # 计算频谱
-    spectrum = fft(sampled_signal)
+    # 计算频谱 - 实信号的频谱是对称的，rfft只计算非负频率部分
+    spectrum = compute_rfft(sampled_signal)
     magnitude = np.abs(spectrum) / N  # 归一化幅度谱
-    
-    # 对于实信号，频谱是对称的，我们只需要前半部分
-    magnitude = magnitude[:N//2]
-    magnitude[1:-1] = 2 * magnitude[1:-1]  # 因为对称性所以幅值乘以2（直流分量和Nyquist频率除外）
+    magnitude[1:(N + 1)//2] *= 2  # 因为对称性所以幅值乘以2（直流分量和Nyquist频率除外）
     
     # 频率轴
-    freqs = fftfreq(N, 1/fs)[:N//2]
+    freqs = rfftfreq(N, 1/fs)
     
     # 创建图表
-    fig = plt.figure(figsize=(14, 8))
+    if fig is None:
+        fig = plt.figure(figsize=(14, 8))
+    else:
+        fig.clf()
     gs = GridSpec(2, 1, height_ratios=[1, 1])
     
     # 时域信号绘制
@@ -74,20 +230,22 @@ def analyze_spectrum(signal, fs, N, title=""):
     
     # 频域信号绘制
     ax2 = fig.add_subplot(gs[1])
-    ax2.stem(freqs, magnitude)  # 新版matplotlib不再需要use_line_collection参数
+    # 用一个LineCollection画所有竖线、一条Line2D画顶端标记，代替逐点创建图元的stem
+    ax2.add_collection(LineCollection(stem_segments(freqs, magnitude), colors='C0'))
+    ax2.plot(freqs, magnitude, 'C0o')
+    ax2.axhline(0, color='C3')  # 与stem相同的零幅值基线
     
     # 添加频谱拟合曲线
-    if len(freqs) > 3:  # 确保有足够的点进行插值
+    # 确保有足够的点进行插值；频点超过约200个时柱状图本身已连成轮廓，拟合曲线只是额外开销
+    if 3 < len(freqs) <= 200:
         # 创建更密集的频率点
         interp_freqs = np.linspace(freqs[0], freqs[-1], len(freqs) * 5)
         
         # 使用三次样条插值，确保曲线平滑
         if len(freqs) > 10:
-            tck = splrep(freqs, magnitude, s=0.01)  # s是平滑参数
-            interp_magnitude = splev(interp_freqs, tck)
+            interp_magnitude = CubicSpline(freqs, magnitude, bc_type='natural')(interp_freqs)
         else:
-            f = interp1d(freqs, magnitude, kind='quadratic', bounds_error=False, fill_value=0)
-            interp_magnitude = f(interp_freqs)
+            interp_magnitude = np.interp(interp_freqs, freqs, magnitude)
             
         # 绘制拟合曲线 - 使用蓝色而不是红色，避免与f1参考线混淆
         ax2.plot(interp_freqs, interp_magnitude, 'b-', linewidth=1.5, alpha=0.7, 
@@ -107,7 +265,7 @@ def analyze_spectrum(signal, fs, N, title=""):
     x_max = min(2 * f2, fs / 2)
     ax2.set_xlim([0, x_max])
     
-    plt.tight_layout()
+    fig.tight_layout()
     return fig
 
 def interactive_experiment():
@@ -119,8 +277,9 @@ def interactive_experiment():
     fs_step = 500   # 采样频率调整步长
     N_step = 100    # 采样点数调整步长
     
-    # 创建图形
-    fig = plt.figure(figsize=(14, 8))
+    # 创建图形 - 使用固定边距，避免每次重绘都求解布局
+    fig = plt.figure(figsize=(14, 8), constrained_layout=False)
+    fig.subplots_adjust(left=0.08, right=0.97, top=0.93, bottom=0.08, hspace=0.35)
     gs = GridSpec(2, 1, height_ratios=[1, 1])
     
     # 时域子图
@@ -132,14 +291,24 @@ def interactive_experiment():
     ax1.set_title('')
     ax1.set_xlabel('Time (s)')
     ax1.set_ylabel('Amplitude')
+    ax1.set_ylim(-2.5, 2.5)
     
     # 频域子图
     ax2 = fig.add_subplot(gs[1])
-    # 初始化时不创建stem图，只在update_plot函数中创建
     ax2.grid(True)
     ax2.set_title('')
     ax2.set_xlabel('Frequency (Hz)')
     ax2.set_ylabel('Magnitude')
+    ax2.set_ylim(0, 1.1)
+    
+    # 频谱柱状图和拟合曲线只创建一次，更新时只替换数据
+    stem_lines = LineCollection([], colors='C0')
+    ax2.add_collection(stem_lines)
+    stem_markers, = ax2.plot([], [], 'C0o')
+    ax2.axhline(0, color='C3')  # 与stem相同的零幅值基线
+    # 拟合曲线 - 使用蓝色而不是红色，避免与f1参考线混淆
+    # 初始隐藏且不进图例，显示时再加入图例
+    fit_line, = ax2.plot([], [], 'b-', linewidth=1.5, alpha=0.7, label='_nolegend_', visible=False)
     
     # 参考线
     f1_line = ax2.axvline(f1, color='r', linestyle='--', label=f'f1={f1}Hz')
@@ -150,26 +319,29 @@ def interactive_experiment():
     fs_current = fs_init
     N_current = N_init
     
+    # 预分配采样序号和时间点缓冲区，点数超出时再扩容
+    sample_index = np.arange(N_init, dtype=np.float32)
+    t_buf = np.empty(N_init, dtype=np.float32)
+    
     def update_plot():
         """更新绘图"""
-        nonlocal fs_current, N_current
-        
-        # 计算时间点 - 使用预分配更高效
-        t = np.arange(N_current) / fs_current
+        nonlocal fs_current, N_current, sample_index, t_buf
         
-        # 采样信号
-        sampled_signal = generate_signal(t)
+        # 计算时间点 - 在预分配的缓冲区中一次完成 n * (1/fs)
+        if N_current > len(t_buf):
+            # 按倍数扩容，连续增加点数时不必每次都重新分配
+            capacity = max(N_current, 2 * len(t_buf))
+            sample_index = np.arange(capacity, dtype=np.float32)
+            t_buf = np.empty(capacity, dtype=np.float32)
+        t = np.multiply(sample_index[:N_current], np.float32(1.0 / fs_current), out=t_buf[:N_current])
         
-        # 计算频谱
-        spectrum = fft(sampled_signal)
-        
-        # 对于实信号，频谱是对称的，我们只需要前半部分
-        half_point = N_current//2
-        magnitude = np.abs(spectrum[:half_point]) / N_current  # 归一化幅度谱
-        magnitude[1:half_point-1] *= 2  # 因为对称性所以幅值乘以2（直流分量和Nyquist频率除外）
+        # 采样并计算频谱 - 实信号的频谱是对称的，rfft只计算非负频率部分
+        sampled_signal, spectrum = sample_and_transform(fs_current, N_current)
+        magnitude = np.abs(spectrum) / N_current  # 归一化幅度谱
+        magnitude[1:(N_current + 1)//2] *= 2  # 因为对称性所以幅值乘以2（直流分量和Nyquist频率除外）
         
         # 频率轴
-        freqs = fftfreq(N_current, 1/fs_current)[:half_point]
+        freqs = rfftfreq(N_current, 1/fs_current)
         
         # 更新时域图
         time_line.set_data(t, sampled_signal)
@@ -180,59 +352,36 @@ def interactive_experiment():
             sample_points.set_visible(False)
         
         ax1.set_xlim(0, t[-1])
-        ax1.set_ylim(-2.5, 2.5)
         
         # 更新频域图
-        # 移除旧的stems和拟合曲线，但保留参考线
-        # 首先保存参考线对象
-        ref_lines = []
-        for line in ax2.lines:
-            if line.get_linestyle() == '--':  # 参考线使用虚线样式
-                ref_lines.append(line)
-                
-        # 清除所有内容
-        ax2.clear()
-        
-        # 重新添加网格和标签
-        ax2.grid(True)
-        ax2.set_xlabel('Frequency (Hz)')
-        ax2.set_ylabel('Magnitude')
+        stem_lines.set_segments(stem_segments(freqs, magnitude))
+        stem_markers.set_data(freqs, magnitude)
         
-        # 先绘制参考线
-        for line in ref_lines:
-            if line.get_xdata()[0] == f1:
-                f1_line = ax2.axvline(f1, color='r', linestyle='--', label=f'f1={f1}Hz')
-            elif line.get_xdata()[0] == f2:
-                f2_line = ax2.axvline(f2, color='g', linestyle='--', label=f'f2={f2}Hz')
-        
-        # 创建频谱柱状图
-        ax2.stem(freqs, magnitude)
-        
-        # 创建拟合曲线
+        # 更新拟合曲线
         # 使用更密集的点进行插值，让曲线更平滑
-        if len(freqs) > 3:  # 确保有足够的点进行插值
+        # 确保有足够的点进行插值；频点超过约200个时柱状图本身已连成轮廓，拟合曲线只是额外开销
+        show_fit = 3 < len(freqs) <= 200
+        if show_fit:
             # 创建更密集的频率点
             interp_freqs = np.linspace(freqs[0], freqs[-1], len(freqs) * 5)
             
             # 使用三次样条插值，确保曲线平滑
             if len(freqs) > 10:  # 足够多的点时使用样条插值
-                tck = splrep(freqs, magnitude, s=0.01)  # s是平滑参数
-                interp_magnitude = splev(interp_freqs, tck)
-            else:  # 点较少时使用更简单的方法
-                f = interp1d(freqs, magnitude, kind='quadratic', bounds_error=False, fill_value=0)
-                interp_magnitude = f(interp_freqs)
-                
-            # 绘制拟合曲线 - 使用蓝色而不是红色，避免与f1参考线混淆
-            ax2.plot(interp_freqs, interp_magnitude, 'b-', linewidth=1.5, alpha=0.7, 
-                    label='Spectrum Fit Curve')
+                interp_magnitude = CubicSpline(freqs, magnitude, bc_type='natural')(interp_freqs)
+            else:  # 点较少时使用线性插值
+                interp_magnitude = np.interp(interp_freqs, freqs, magnitude)
             
-            # 更新图例
+            fit_line.set_data(interp_freqs, interp_magnitude)
+        
+        # 拟合曲线显示状态变化时同步更新图例，隐藏时不在图例中列出
+        if show_fit != fit_line.get_visible():
+            fit_line.set_visible(show_fit)
+            fit_line.set_label('Spectrum Fit Curve' if show_fit else '_nolegend_')
             ax2.legend()
         
         # 限制x轴显示范围为0到2*f2或者Nyquist频率，取较小值
         x_max = min(2 * f2, fs_current / 2)
         ax2.set_xlim(0, x_max)
-        ax2.set_ylim(0, 1.1)
         
         # 更新标题
         if fs_current < 2 * f2:
@@ -249,29 +398,33 @@ def interactive_experiment():
     def on_key(event):
         nonlocal fs_current, N_current
         
+        # 只有采样参数确实改变时才需要重绘
+        changed = False
         if event.key == 'up':  # 增加采样频率
             fs_current += fs_step
+            changed = True
             print(f"Sampling frequency increased to: {fs_current}Hz")
         elif event.key == 'down' and fs_current > fs_step:  # 减少采样频率
             fs_current -= fs_step
+            changed = True
             print(f"Sampling frequency decreased to: {fs_current}Hz")
         elif event.key == 'right':  # 增加采样点数
             N_current += N_step
+            changed = True
             print(f"Sample count increased to: {N_current}")
         elif event.key == 'left' and N_current > N_step:  # 减少采样点数
             N_current -= N_step
+            changed = True
             print(f"Sample count decreased to: {N_current}")
         elif event.key == 's':  # 保存图像
             filename = f'experiment_fs_{fs_current}_N_{N_current}.png'
-            plt.savefig(filename, dpi=150)
+            save_png(fig, filename)
             print(f"Image saved as: {filename}")
         elif event.key == 'q':  # 退出
             plt.close(fig)
-            return
-        else:
-            return
-            
-        update_plot()
+        
+        if changed:
+            update_plot()
     
     # 初始化绘图
     update_plot()
@@ -280,14 +433,13 @@ def interactive_experiment():
     fig.canvas.mpl_connect('key_press_event', on_key)
     
     # 显示图像
-    plt.tight_layout()
     plt.show()
 
 def run_standard_experiment():
     """运行标准实验，探究不同采样频率和采样点数的影响"""
     
-    # 预分配图表对象列表，避免频繁创建和销毁图表
-    figures = []
+    # 所有实验复用同一个图表，每次重绘后立即保存，避免同时保留多个画布
+    fig = plt.figure(figsize=(14, 8))
     
     # 实验1: 不同采样频率
     sampling_frequencies = [2500, 4000, 8000]  # Hz
@@ -296,9 +448,8 @@ def run_standard_experiment():
     # 对每个采样频率进行实验
     for fs in sampling_frequencies:
         title = f"采样频率={fs}Hz, 采样点数={N}"
-        fig = analyze_spectrum(generate_signal, fs, N, title)
-        plt.savefig(f'experiment_fs_{fs}_N_{N}.png', dpi=150)
-        figures.append(fig)
+        analyze_spectrum(generate_signal, fs, N, title, fig)
+        save_png(fig, f'experiment_fs_{fs}_N_{N}.png')
     
     # 实验2: 不同采样点数
     fs = 4000  # Hz
@@ -307,9 +458,8 @@ def run_standard_experiment():
     # 对每个采样点数进行实验
     for N in sample_sizes:
         title = f"采样频率={fs}Hz, 采样点数={N}"
-        fig = analyze_spectrum(generate_signal, fs, N, title)
-        plt.savefig(f'experiment_fs_{fs}_N_{N}.png', dpi=150)
-        figures.append(fig)
+        analyze_spectrum(generate_signal, fs, N, title, fig)
+        save_png(fig, f'experiment_fs_{fs}_N_{N}.png')
     
     # 实验3: 欠采样情况
     fs_undersampling = [1500, 1800]  # Hz (低于2*f2)
@@ -318,9 +468,8 @@ def run_standard_experiment():
     # 对欠采样频率进行实验
     for fs in fs_undersampling:
         title = f"欠采样: 采样频率={fs}Hz, 采样点数={N}"
-        fig = analyze_spectrum(generate_signal, fs, N, title)
-        plt.savefig(f'experiment_undersampling_fs_{fs}_N_{N}.png', dpi=150)
-        figures.append(fig)
+        analyze_spectrum(generate_signal, fs, N, title, fig)
+        save_png(fig, f'experiment_undersampling_fs_{fs}_N_{N}.png')
     
     plt.show()
 